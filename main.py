@@ -1,20 +1,67 @@
+import hashlib
+import logging
 import os
-from typing import List, Optional
-from fastapi import FastAPI, Query
+from typing import Any, List, Optional
+import orjson
+from cachetools import TTLCache
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from datetime import datetime
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timezone
 
-from database import db, create_document, get_documents
+from database import db, create_many, get_documents
 
-app = FastAPI(title="Riftlol Store API")
+logger = logging.getLogger(__name__)
 
+
+def dump_json(content: Any) -> bytes:
+    """Encode with orjson, falling back to str() for Mongo values such as ObjectId"""
+    return orjson.dumps(content, default=str)
+
+
+class DocumentResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def etag_for(body: bytes) -> str:
+    """Weak ETag for an encoded response body"""
+    return f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def cacheable_json(request: Request, body: bytes, etag: str) -> Response:
+    """Return encoded JSON with its ETag, or 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=30"}
+    # weak comparison: W/"x" and "x" match
+    tag = etag.removeprefix("W/")
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or any(
+        t.strip().removeprefix("W/") == tag for t in if_none_match.split(",")
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+app = FastAPI(title="Riftlol Store API", default_response_class=DocumentResponse)
+
+# Comma-separated allow-list of frontend origins, e.g. "https://shop.example.com"
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
+
+# The API is read-only. Requests without an Origin header (same-origin, server
+# to server, healthchecks) already bypass CORSMiddleware before any header work
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET"],
+    allow_headers=["Content-Type", "If-None-Match"],
+    # ETag is not CORS-safelisted; browsers hide it from scripts unless exposed
+    expose_headers=["ETag"],
 )
 
 
@@ -34,158 +81,242 @@ class ProductOut(BaseModel):
     created_at: Optional[datetime] = None
 
 
+class ProductPage(BaseModel):
+    items: List[ProductOut]
+    next: Optional[str] = None
+
+
+# Fields rendered by the catalog cards; description is only needed on detail views
+CARD_PROJECTION = {
+    "title": 1,
+    "price": 1,
+    "category": 1,
+    "in_stock": 1,
+    "images": 1,
+    "rating": 1,
+    "stock_qty": 1,
+    "tags": 1,
+    "featured": 1,
+    "created_at": 1,
+}
+
+
 def serialize_doc(doc: dict) -> dict:
-    d = doc.copy()
-    if d.get("_id"):
-        d["id"] = str(d.pop("_id"))
-    # convert datetimes to isoformat for JSON
-    for k, v in list(d.items()):
-        if isinstance(v, datetime):
-            d[k] = v.isoformat()
-    return d
+    """Rename _id to id in place; orjson encodes created_at like isoformat()"""
+    _id = doc.pop("_id", None)
+    if _id is not None:
+        doc["id"] = str(_id)
+    return doc
+
+
+# Demo catalog inserted on first boot; create_many copies each entry before insert
+_DEMO_PRODUCTS: tuple[dict, ...] = (
+    {
+        "title": "Stitch Plush - Classic Blue",
+        "description": "Super-soft Stitch plush, 12-inch collectible.",
+        "price": 24.99,
+        "category": "plush",
+        "in_stock": True,
+        "images": [
+            "https://images.unsplash.com/photo-1546778316-dfda79f1c5d0?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "rating": 4.8,
+        "stock_qty": 120,
+        "tags": ["stitch", "plush", "disney"],
+        "featured": True,
+    },
+    {
+        "title": "Stitch Keychain Mini Plush",
+        "description": "Pocket-size Stitch charm for backpacks.",
+        "price": 9.99,
+        "category": "accessories",
+        "in_stock": True,
+        "images": [
+            "https://images.unsplash.com/photo-1588422333073-3f83f9b7f1a3?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "rating": 4.6,
+        "stock_qty": 300,
+        "tags": ["stitch", "keychain"],
+        "featured": True,
+    },
+    {
+        "title": "Trading Card Booster Pack - Riftlol Edition",
+        "description": "10 cards per pack, chance of holographic rares.",
+        "price": 5.99,
+        "category": "cards",
+        "in_stock": True,
+        "images": [
+            "https://images.unsplash.com/photo-1603575449060-397ac9c3e9b3?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "rating": 4.5,
+        "stock_qty": 500,
+        "tags": ["trading", "cards", "booster"],
+        "featured": True,
+    },
+    {
+        "title": "Collector Binder - Neon Rift",
+        "description": "Store up to 360 cards with UV-protect sleeves.",
+        "price": 19.99,
+        "category": "cards",
+        "in_stock": True,
+        "images": [
+            "https://images.unsplash.com/photo-1603570419969-23f9139abf1d?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "rating": 4.7,
+        "stock_qty": 220,
+        "tags": ["binder", "cards"],
+        "featured": False,
+    },
+    {
+        "title": "Arcade Pixel Lamp",
+        "description": "RGB mood lamp inspired by retro arcades.",
+        "price": 29.99,
+        "category": "toys",
+        "in_stock": True,
+        "images": [
+            "https://images.unsplash.com/photo-1520975693411-b46f52b85097?q=80&w=1200&auto=format&fit=crop",
+        ],
+        "rating": 4.4,
+        "stock_qty": 80,
+        "tags": ["lamp", "gaming"],
+        "featured": False,
+    },
+)
 
 
-# ----- Startup: seed demo data if empty -----
+# ----- Startup: create indexes, then seed demo data if empty -----
 @app.on_event("startup")
-def seed_if_empty():
+async def ensure_indexes():
+    """Index the featured/category filters together with _id, the keyset pagination order"""
     try:
         if db is None:
             return
-        count = db["product"].count_documents({})
+        # equality fields first, then _id so the keyset sort in list_products
+        # is read straight off the index instead of sorted in memory
+        await db["product"].create_indexes([
+            IndexModel([("featured", ASCENDING), ("category", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("category", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("featured", ASCENDING), ("_id", ASCENDING)]),
+        ])
+    except Exception:
+        # keep booting, but a missing index turns every listing into a collection scan
+        logger.exception("Could not create product indexes")
+
+
+@app.on_event("startup")
+async def seed_if_empty():
+    try:
+        if db is None:
+            return
+        count = await db["product"].count_documents({})
         if count == 0:
-            demo_products = [
-                {
-                    "title": "Stitch Plush - Classic Blue",
-                    "description": "Super-soft Stitch plush, 12-inch collectible.",
-                    "price": 24.99,
-                    "category": "plush",
-                    "in_stock": True,
-                    "images": [
-                        "https://images.unsplash.com/photo-1546778316-dfda79f1c5d0?q=80&w=1200&auto=format&fit=crop",
-                    ],
-                    "rating": 4.8,
-                    "stock_qty": 120,
-                    "tags": ["stitch", "plush", "disney"],
-                    "featured": True,
-                },
-                {
-                    "title": "Stitch Keychain Mini Plush",
-                    "description": "Pocket-size Stitch charm for backpacks.",
-                    "price": 9.99,
-                    "category": "accessories",
-                    "in_stock": True,
-                    "images": [
-                        "https://images.unsplash.com/photo-1588422333073-3f83f9b7f1a3?q=80&w=1200&auto=format&fit=crop",
-                    ],
-                    "rating": 4.6,
-                    "stock_qty": 300,
-                    "tags": ["stitch", "keychain"],
-                    "featured": True,
-                },
-                {
-                    "title": "Trading Card Booster Pack - Riftlol Edition",
-                    "description": "10 cards per pack, chance of holographic rares.",
-                    "price": 5.99,
-                    "category": "cards",
-                    "in_stock": True,
-                    "images": [
-                        "https://images.unsplash.com/photo-1603575449060-397ac9c3e9b3?q=80&w=1200&auto=format&fit=crop",
-                    ],
-                    "rating": 4.5,
-                    "stock_qty": 500,
-                    "tags": ["trading", "cards", "booster"],
-                    "featured": True,
-                },
-                {
-                    "title": "Collector Binder - Neon Rift",
-                    "description": "Store up to 360 cards with UV-protect sleeves.",
-                    "price": 19.99,
-                    "category": "cards",
-                    "in_stock": True,
-                    "images": [
-                        "https://images.unsplash.com/photo-1603570419969-23f9139abf1d?q=80&w=1200&auto=format&fit=crop",
-                    ],
-                    "rating": 4.7,
-                    "stock_qty": 220,
-                    "tags": ["binder", "cards"],
-                    "featured": False,
-                },
-                {
-                    "title": "Arcade Pixel Lamp",
-                    "description": "RGB mood lamp inspired by retro arcades.",
-                    "price": 29.99,
-                    "category": "toys",
-                    "in_stock": True,
-                    "images": [
-                        "https://images.unsplash.com/photo-1520975693411-b46f52b85097?q=80&w=1200&auto=format&fit=crop",
-                    ],
-                    "rating": 4.4,
-                    "stock_qty": 80,
-                    "tags": ["lamp", "gaming"],
-                    "featured": False,
-                },
-            ]
-            for p in demo_products:
-                create_document("product", p)
+            # Every worker runs this hook; only the one that claims the marker
+            # document (unique by _id) seeds, the others skip
+            try:
+                await db["seed"].insert_one({"_id": "product", "seeded_at": datetime.now(timezone.utc)})
+            except DuplicateKeyError:
+                return
+            await create_many("product", _DEMO_PRODUCTS)
     except Exception:
         # fail silently so app still boots even if DB not configured
         pass
 
 
 # ----- Basic routes -----
+# Encoded once at import; a fresh Response per request keeps middleware from
+# appending headers to a shared instance
+_ROOT_BODY = dump_json({"message": "Riftlol Store API running"})
+
+
 @app.get("/")
-def read_root():
-    return {"message": "Riftlol Store API running"}
+async def read_root():
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
-@app.get("/api/products")
-def list_products(
+# ProductOut is advertised in the OpenAPI schema only; Mongo docs are trusted and
+# returned without running them through pydantic validation
+@app.get("/api/products", response_model=None, responses={200: {"model": ProductPage}})
+async def list_products(
+    request: Request,
     category: Optional[str] = Query(default=None),
     featured: Optional[bool] = Query(default=None),
     limit: int = Query(default=24, ge=1, le=100),
+    after: Optional[str] = Query(default=None, description="Cursor returned as `next` by the previous page"),
 ):
-    """List products with optional filters"""
+    """List products with optional filters, paginated by _id cursor"""
+    filt = {}
+    if after:
+        try:
+            filt["_id"] = {"$gt": ObjectId(after)}
+        except (InvalidId, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     try:
-        filt = {}
         if category:
             filt["category"] = category
         if featured is not None:
             filt["featured"] = featured
-        docs = get_documents("product", filt, limit)
-        return [serialize_doc(d) for d in docs]
+        docs = await get_documents("product", filt, limit, CARD_PROJECTION, sort=[("_id", ASCENDING)])
+        for d in docs:
+            serialize_doc(d)
+        # a short page means there is nothing after it
+        page = {"items": docs, "next": docs[-1]["id"] if len(docs) == limit else None}
+        # pre-encoded Response skips FastAPI's jsonable_encoder pass
+        body = dump_json(page)
+        return cacheable_json(request, body, etag_for(body))
     except Exception as e:
-        # If DB unavailable, return empty list with reason
-        return []
+        # If DB unavailable, return empty page with reason
+        return {"items": [], "next": None}
 
 
-@app.get("/api/featured")
-def featured_products(limit: int = Query(default=8, ge=1, le=24)):
-    try:
-        docs = get_documents("product", {"featured": True}, limit)
-        return [serialize_doc(d) for d in docs]
-    except Exception:
-        return []
+# Serialized /api/featured (body, etag) pairs keyed by limit; invalidate here once writes exist
+_featured_cache = TTLCache(maxsize=32, ttl=30)
+
+
+@app.get("/api/featured", response_model=None, responses={200: {"model": List[ProductOut]}})
+async def featured_products(request: Request, limit: int = Query(default=8, ge=1, le=24)):
+    cached = _featured_cache.get(limit)
+    if cached is None:
+        try:
+            docs = await get_documents("product", {"featured": True}, limit, CARD_PROJECTION)
+        except Exception:
+            return []
+        for d in docs:
+            serialize_doc(d)
+        body = dump_json(docs)
+        cached = _featured_cache[limit] = (body, etag_for(body))
+    return cacheable_json(request, *cached)
+
+
+# Healthchecks hit /test often; list collections at most once per 10 seconds.
+# While an entry is cached /test does not touch Mongo, so for up to 10 seconds
+# after the database goes down it can still report "Connected & Working".
+_collections_cache = TTLCache(maxsize=1, ttl=10)
+
+# Env vars are only read at import (as in database.py), so these never change
+_TEST_ENV = {
+    "database_url": "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set",
+    "database_name": "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set",
+}
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     """Test endpoint to check if database is available and accessible"""
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
-        "database_url": None,
-        "database_name": None,
+        **_TEST_ENV,
         "connection_status": "Not Connected",
-        "collections": []
+        "collections": [],
     }
     try:
         if db is not None:
             response["database"] = "✅ Available"
-            response["database_url"] = "✅ Configured"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = _collections_cache.get("names")
+                if collections is None:
+                    collections = _collections_cache["names"] = await db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -195,13 +326,19 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
-
     return response
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # "auto" picks uvloop when installed; it is not available on Windows
+        loop="auto",
+        http="httptools",
+        access_log=False,
+    )
@@ -11,7 +11,7 @@ Model name is converted to lowercase for the collection name:
 - BlogPost -> "blogs" collection
 """
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 class User(BaseModel):
@@ -35,7 +35,7 @@ class Product(BaseModel):
     price: float = Field(..., ge=0, description="Price in dollars")
     category: str = Field(..., description="Product category, e.g., toys, plush, cards")
     in_stock: bool = Field(True, description="Whether product is in stock")
-    images: List[HttpUrl] | None = Field(default=None, description="Image URLs for the product")
+    images: List[str] | None = Field(default=None, description="Image URLs for the product")
     rating: Optional[float] = Field(default=None, ge=0, le=5, description="Average rating 0-5")
     stock_qty: Optional[int] = Field(default=0, ge=0, description="Units available in stock")
     tags: List[str] | None = Field(default=None, description="Searchable tags")
@@ -0,0 +1,110 @@
+import pytest
+from bson import ObjectId
+from cachetools import TTLCache
+from fastapi.testclient import TestClient
+from pymongo import ASCENDING
+from starlette.requests import Request
+
+import main
+
+client = TestClient(main.app)
+
+
+def _fake_products(monkeypatch, count):
+    """Serve `count` products from get_documents and record each query's filter and sort"""
+    ids = [ObjectId() for _ in range(count)]
+    calls = []
+
+    async def get_documents(collection_name, filter_dict=None, limit=None, projection=None, sort=None):
+        calls.append({"filter": filter_dict, "sort": sort})
+        return [{"_id": _id, "title": f"Product {i}", "price": 1.0} for i, _id in enumerate(ids[:limit])]
+
+    monkeypatch.setattr(main, "get_documents", get_documents)
+    return ids, calls
+
+
+def test_full_page_returns_next_cursor(monkeypatch):
+    ids, _ = _fake_products(monkeypatch, 3)
+    body = client.get("/api/products", params={"limit": 3}).json()
+    assert [p["id"] for p in body["items"]] == [str(i) for i in ids]
+    assert body["next"] == str(ids[-1])
+
+
+def test_short_page_has_no_next_cursor(monkeypatch):
+    _fake_products(monkeypatch, 2)
+    body = client.get("/api/products", params={"limit": 3}).json()
+    assert len(body["items"]) == 2
+    assert body["next"] is None
+
+
+def test_after_cursor_filters_by_id(monkeypatch):
+    _, calls = _fake_products(monkeypatch, 1)
+    after = ObjectId()
+    client.get("/api/products", params={"after": str(after)})
+    assert calls[-1]["filter"]["_id"] == {"$gt": after}
+    # keyset pagination is only correct if pages come back in _id order
+    assert calls[-1]["sort"] == [("_id", ASCENDING)]
+
+
+def test_invalid_after_cursor_is_rejected(monkeypatch):
+    _, calls = _fake_products(monkeypatch, 1)
+    response = client.get("/api/products", params={"after": "not-an-id"})
+    assert response.status_code == 400
+    assert calls == []
+
+
+def test_empty_after_cursor_is_ignored(monkeypatch):
+    _, calls = _fake_products(monkeypatch, 1)
+    response = client.get("/api/products", params={"after": ""})
+    assert response.status_code == 200
+    assert "_id" not in calls[-1]["filter"]
+
+
+def _request(if_none_match=None):
+    headers = [] if if_none_match is None else [(b"if-none-match", if_none_match.encode())]
+    return Request({"type": "http", "headers": headers})
+
+
+def test_cacheable_json_without_if_none_match_sends_body():
+    etag = main.etag_for(b"[]")
+    response = main.cacheable_json(_request(), b"[]", etag)
+    assert response.status_code == 200
+    assert response.body == b"[]"
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == "public, max-age=30"
+
+
+@pytest.mark.parametrize("header", [
+    '{etag}',
+    '{tag}',
+    '"other", {etag}',
+    '"other" ,{tag}',
+    '*',
+])
+def test_cacheable_json_matching_if_none_match_is_not_modified(header):
+    etag = main.etag_for(b"[]")
+    header = header.format(etag=etag, tag=etag.removeprefix("W/"))
+    response = main.cacheable_json(_request(header), b"[]", etag)
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.parametrize("header", ['W/"other"', '"other", "another"', ""])
+def test_cacheable_json_stale_if_none_match_sends_body(header):
+    etag = main.etag_for(b"[]")
+    response = main.cacheable_json(_request(header), b"[]", etag)
+    assert response.status_code == 200
+    assert response.body == b"[]"
+
+
+def test_featured_serves_cached_body_and_etag(monkeypatch):
+    # fresh cache so fake bodies never leak into other tests
+    monkeypatch.setattr(main, "_featured_cache", TTLCache(maxsize=32, ttl=30))
+    _, calls = _fake_products(monkeypatch, 2)
+    first = client.get("/api/featured")
+    second = client.get("/api/featured", headers={"If-None-Match": first.headers["etag"]})
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.headers["etag"] == first.headers["etag"]
+    assert len(calls) == 1